@@ -1,11 +1,15 @@
 # auth.py
-import os, hashlib, secrets
+import os, hashlib, hmac, secrets, threading
 from datetime import datetime, timedelta
+from typing import Optional
+from cachetools import TTLCache
 from jose import JWTError, jwt
+from argon2 import PasswordHasher
+from argon2.exceptions import VerificationError, InvalidHashError
 from fastapi import Depends, HTTPException
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
-from database import get_db
+from database import get_conn
 
 load_dotenv()
 SECRET = os.getenv("SECRET_KEY", "supersecret")
@@ -13,17 +17,47 @@ ALGORITHM = "HS256"
 TOKEN_EXPIRE_HOURS = 4
 security = HTTPBearer()
 
-def hash_password(pw: str): 
+# --- Passwords: argon2id (argon2-cffi defaults)
+# Hashing is deliberately CPU-heavy; the auth routes are plain `def`, so FastAPI
+# already runs them in its threadpool. Cap concurrent hashers at the core count
+# so a burst of signups/logins can't starve every other threadpool request.
+_hasher = PasswordHasher()
+_hash_slots = threading.BoundedSemaphore(os.cpu_count() or 1)
+# Verified against when the email is unknown, so that path costs the same
+# argon2 work as a wrong password and timing doesn't reveal which emails exist
+_DUMMY_HASH = _hasher.hash(secrets.token_hex())
+
+def _legacy_sha256(pw: str):
     return hashlib.sha256(pw.encode()).hexdigest()
 
-def verify_password(pw, hashed): 
-    return hash_password(pw) == hashed
+def hash_password(pw: str):
+    with _hash_slots:
+        return _hasher.hash(pw)
+
+def verify_password(pw, hashed):
+    """hashed=None (no such user) still runs a full argon2 verify, then fails."""
+    if hashed is None:
+        verify_password(pw, _DUMMY_HASH)
+        return False
+    # Accounts created before argon2id still store an unsalted sha256 hex digest
+    if not hashed.startswith("$argon2"):
+        return hmac.compare_digest(_legacy_sha256(pw), hashed)
+    with _hash_slots:
+        try:
+            return _hasher.verify(hashed, pw)
+        except (VerificationError, InvalidHashError):
+            return False
+
+def needs_rehash(hashed):
+    return not hashed.startswith("$argon2") or _hasher.check_needs_rehash(hashed)
 
 def create_token(username: str):
     payload = {"sub": username, "exp": datetime.utcnow() + timedelta(hours=TOKEN_EXPIRE_HOURS)}
     return jwt.encode(payload, SECRET, algorithm=ALGORITHM)
 
-def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
+# async: an HS256 decode takes microseconds, so it runs on the event loop
+# instead of taking a threadpool slot (shared with argon2) on every request
+async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
     token = credentials.credentials
     try:
         payload = jwt.decode(token, SECRET, algorithms=[ALGORITHM])
@@ -31,6 +65,42 @@ def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
 
+# --- users queries, shared by both apps (passed verbatim so sqlite3's
+# per-connection statement cache, keyed by SQL text, reuses them)
+SQL_GET_USER_ID = "SELECT id FROM users WHERE username=?"
+SQL_GET_USER_BY_EMAIL = "SELECT id, username, password FROM users WHERE email=?"
+SQL_GET_USER_CONTACT = "SELECT username, email FROM users WHERE email=?"
+SQL_INSERT_USER = "INSERT INTO users (email, username, password) VALUES (?, ?, ?)"
+SQL_UPDATE_PASSWORD_BY_ID = "UPDATE users SET password=? WHERE id=?"
+SQL_UPDATE_PASSWORD_BY_EMAIL = "UPDATE users SET password=? WHERE email=?"
+
+# --- username -> users.id cache
+# Lets authenticated routes skip the users lookup. No route renames or deletes
+# users, so entries never go stale in-process; the TTL ages out rows removed
+# out-of-band.
+USER_ID_CACHE = TTLCache(maxsize=10_000, ttl=600)
+_user_id_lock = threading.Lock()  # TTLCache is not thread-safe
+
+def cached_user_id(username: str) -> Optional[int]:
+    with _user_id_lock:
+        return USER_ID_CACHE.get(username)
+
+def remember_user_id(username: str, user_id: int):
+    with _user_id_lock:
+        USER_ID_CACHE[username] = user_id
+
+def user_id_for(username: str) -> Optional[int]:
+    """Cached users.id for a username; queries SQLite on a miss (blocking)."""
+    user_id = cached_user_id(username)
+    if user_id is None:
+        with get_conn() as conn:
+            row = conn.execute(SQL_GET_USER_ID, (username,)).fetchone()
+        if row is None:
+            return None
+        user_id = row[0]
+        remember_user_id(username, user_id)
+    return user_id
+
 # --- Forgot password token (short-lived)
 def create_reset_token(email: str):
     payload = {"sub": email, "exp": datetime.utcnow() + timedelta(minutes=15)}
@@ -0,0 +1,22 @@
+# compression.py
+from starlette.middleware.gzip import GZipMiddleware
+
+# File-serving paths: PDFs are already deflate-compressed, and their static
+# ETags must not be shared between gzipped and plain bodies
+UNCOMPRESSED_PREFIXES = ("/uploads/", "/generated_resumes/", "/download-pdf/")
+
+
+class ApiGZipMiddleware:
+    """GZipMiddleware for the JSON API only; file-serving paths pass through untouched."""
+
+    def __init__(self, app, minimum_size: int = 1024, compresslevel: int = 5,
+                 skip_prefixes: tuple = UNCOMPRESSED_PREFIXES):
+        self.app = app
+        self.gzip = GZipMiddleware(app, minimum_size=minimum_size, compresslevel=compresslevel)
+        self.skip_prefixes = skip_prefixes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and not scope["path"].startswith(self.skip_prefixes):
+            await self.gzip(scope, receive, send)
+        else:
+            await self.app(scope, receive, send)
@@ -1,11 +1,18 @@
 # config.py
 import os
+from dotenv import load_dotenv
 
-if os.name == "nt":
-    DATA_ROOT = os.path.abspath(r"C:\career_ai_data")
-else:
-    DATA_ROOT = os.path.abspath(os.getenv("DATA_ROOT", "/app/data"))
+load_dotenv()
+
+# Single source of truth for on-disk paths; every module imports from here
+IS_WINDOWS = os.name == "nt"
+
+DEFAULT_DATA_ROOT = r"C:\career_ai_data" if IS_WINDOWS else "/app/data"
+DATA_ROOT = os.path.abspath(os.getenv("DATA_ROOT", DEFAULT_DATA_ROOT))
 
 DB_PATH = os.path.join(DATA_ROOT, "career_ai.db")
 UPLOAD_DIR = os.path.join(DATA_ROOT, "uploads")
 GENERATED_DIR = os.path.join(DATA_ROOT, "generated_resumes")
+
+# MiKTeX only on Windows; the Linux image ships TeX Live on PATH
+MIKTEX_PATH = r"C:\Program Files\MiKTeX\miktex\bin\x64" if IS_WINDOWS else None
@@ -1,19 +1,41 @@
 # database.py
 import os
+import queue
 import sqlite3
 import logging
-from dotenv import load_dotenv
+import threading
+import time
+from contextlib import contextmanager
 
-load_dotenv()
+from config import DB_PATH
 
-# Single source of truth for DATA_ROOT and DB_PATH
-if os.name == "nt":
-    DEFAULT_DATA_ROOT = r"C:\career_ai_data"
-else:
-    DEFAULT_DATA_ROOT = "/app/data"
+# Per-connection prepared-statement cache (sqlite3 default is 128)
+CACHED_STATEMENTS = 256
 
-DATA_ROOT = os.path.abspath(os.getenv("DATA_ROOT", DEFAULT_DATA_ROOT))
-DB_PATH = os.path.join(DATA_ROOT, "career_ai.db")
+# Run once on every new connection. journal_mode=WAL is persistent in the
+# DB file and is set by init_database(); with WAL, synchronous=NORMAL only
+# fsyncs at checkpoints instead of on every commit.
+CONNECTION_PRAGMAS = (
+    "PRAGMA foreign_keys=ON;",
+    "PRAGMA synchronous=NORMAL;",
+    "PRAGMA temp_store=MEMORY;",
+    "PRAGMA cache_size=-64000;",  # 64 MB page cache
+    "PRAGMA mmap_size=268435456;",  # 256 MB: reads come straight from the OS page cache
+    "PRAGMA analysis_limit=1000;",  # bound the rows ANALYZE / optimize sample per index
+)
+
+
+def connect():
+    """Open a connection to DB_PATH with the standard PRAGMAs applied."""
+    conn = sqlite3.connect(
+        DB_PATH,
+        check_same_thread=False,
+        timeout=30.0,
+        cached_statements=CACHED_STATEMENTS,
+    )
+    for pragma in CONNECTION_PRAGMAS:
+        conn.execute(pragma)
+    return conn
 
 
 def get_db():
@@ -27,9 +49,166 @@ def get_db():
     """
     try:
         os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
-        conn = sqlite3.connect(DB_PATH, check_same_thread=False, timeout=30.0)
-        conn.execute("PRAGMA foreign_keys=ON;")
-        return conn
+        return connect()
     except Exception as e:
         logging.error(f"[DB] Failed to connect to {DB_PATH}: {e}", exc_info=True)
         raise
+
+
+# ==========================================================
+# CONNECTION POOL
+# ==========================================================
+POOL_SIZE = 8
+POOL_TIMEOUT = 30.0
+# Pooled connections are long-lived, so PRAGMA optimize runs on check-in at
+# most this often (SQLite's advice for long-lived connections) and on close.
+OPTIMIZE_INTERVAL = 3600.0
+
+
+class SqlitePool:
+    """
+    Bounded pool of long-lived connections.
+
+    Reusing connections keeps each one's page cache and prepared-statement
+    cache warm, instead of paying sqlite3_open + schema parse + PRAGMAs on
+    every request. Connections are opened lazily up to `size`; after that,
+    callers wait for one to be returned.
+    """
+
+    def __init__(self, size: int = POOL_SIZE, timeout: float = POOL_TIMEOUT):
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue(maxsize=size)  # LIFO: reuse the hottest connection
+        self._opened = 0
+        self._lock = threading.Lock()
+        self._optimized_at = time.monotonic()
+
+    def _open(self):
+        conn = get_db()
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _optimize(self, conn):
+        try:
+            conn.execute("PRAGMA optimize;")
+        except sqlite3.Error as e:
+            logging.warning(f"[DB] PRAGMA optimize failed: {e}")
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        finally:
+            with self._lock:
+                self._opened -= 1
+
+    def _checkout(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            can_open = self._opened < self.size
+            if can_open:
+                self._opened += 1
+        if can_open:
+            try:
+                return self._open()
+            except Exception:
+                with self._lock:
+                    self._opened -= 1
+                raise
+
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise sqlite3.OperationalError("database connection pool exhausted")
+
+    def _checkin(self, conn):
+        try:
+            # Never hand the next caller a half-finished transaction
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error as e:
+            logging.warning(f"[DB] Dropping broken pooled connection: {e}")
+            self._discard(conn)
+            return
+
+        now = time.monotonic()
+        with self._lock:
+            due = now - self._optimized_at >= OPTIMIZE_INTERVAL
+            if due:
+                self._optimized_at = now
+        if due:
+            # Refreshes sqlite_stat1 only for tables whose stats look stale
+            self._optimize(conn)
+        self._idle.put_nowait(conn)
+
+    def fill(self):
+        """Open connections up to `size` now, so first requests don't pay for it."""
+        while True:
+            with self._lock:
+                if self._opened >= self.size:
+                    return
+                self._opened += 1
+            try:
+                conn = self._open()
+            except Exception:
+                with self._lock:
+                    self._opened -= 1
+                raise
+            self._idle.put_nowait(conn)
+
+    @contextmanager
+    def acquire(self):
+        conn = self._checkout()
+        try:
+            yield conn
+        finally:
+            self._checkin(conn)
+
+    def close_all(self):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._optimize(conn)
+            self._discard(conn)
+
+
+pool = SqlitePool()
+
+
+def get_conn():
+    """
+    Borrow a pooled connection (rows come back as sqlite3.Row):
+
+        with get_conn() as conn:
+            conn.execute(...)
+
+    Use get_db() instead for one-off scripts that want their own connection.
+    """
+    return pool.acquire()
+
+
+@contextmanager
+def transaction():
+    """
+    Borrow a pooled connection inside BEGIN IMMEDIATE ... COMMIT:
+
+        with transaction() as conn:
+            conn.execute(...)
+
+    Commits when the block exits normally and rolls back on any exception
+    (HTTPException included). IMMEDIATE takes the write lock up front, so a
+    writer waits on busy_timeout instead of failing a read-to-write upgrade.
+    """
+    with pool.acquire() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
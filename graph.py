@@ -24,8 +24,7 @@ except ImportError as e:
 # ==========================================================
 # CONFIG
 # ==========================================================
-DATA_ROOT = os.getenv("DATA_ROOT", r"C:\career_ai_data")
-GEN_DIR = os.path.join(DATA_ROOT, "generated_resumes")
+from config import GENERATED_DIR as GEN_DIR
 os.makedirs(GEN_DIR, exist_ok=True)
 
 if not load_dotenv():
@@ -63,6 +62,23 @@ memory_store = ThreadSafeMemoryStore()
 # ==========================================================
 # SAFE LLM INVOKE
 # ==========================================================
+# Keep-alive sessions for provider calls, so each prompt reuses an open TLS
+# connection instead of paying TCP + TLS handshakes. requests does not promise
+# that a Session is thread-safe, and agents run on main.py's executor threads,
+# so each thread gets its own session (at most one per executor worker).
+_http_local = threading.local()
+
+
+def http_session() -> requests.Session:
+    session = getattr(_http_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        # One request in flight per thread: one pooled connection per provider host
+        session.mount("https://", requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=1))
+        _http_local.session = session
+    return session
+
+
 def safe_llm_invoke(prompt: str, timeout: int = 30) -> str:
     start_time = time.time()
     if len(prompt) > 4000:
@@ -75,7 +91,7 @@ def safe_llm_invoke(prompt: str, timeout: int = 30) -> str:
             logging.warning("[LLM] OPENROUTER_API_KEY not configured")
         else:
             logging.info("[LLM] Sending prompt to OpenRouter")
-            response = requests.post(
+            response = http_session().post(
                 "https://openrouter.ai/api/v1/chat/completions",
                 headers={
                     "Authorization": f"Bearer {openrouter_key}",
@@ -108,7 +124,7 @@ def safe_llm_invoke(prompt: str, timeout: int = 30) -> str:
             logging.warning("[LLM] HF_API_KEY not configured")
         else:
             logging.info("[LLM] Falling back to Hugging Face")
-            response = requests.post(
+            response = http_session().post(
                 "https://api-inference.huggingface.co/models/google/gemma-2-2b-it",
                 headers={"Authorization": f"Bearer {hf_key}"},
                 json={"inputs": prompt},
@@ -133,9 +149,20 @@ def safe_llm_invoke(prompt: str, timeout: int = 30) -> str:
 # ==========================================================
 # FALLBACK RESPONSES
 # ==========================================================
+# Whole-word keyword sets, with the inflections the old substring checks caught
+CAREER_WORDS = frozenset({"resume", "resumes", "cv", "career", "careers", "job", "jobs", "apply", "applying"})
+SQL_WORDS = frozenset({"sql", "database", "databases"})
+PYTHON_WORDS = frozenset({"python"})
+WEB_WORDS = frozenset({"javascript", "web", "website", "websites"})
+LEARN_WORDS = frozenset({"learn", "learning", "study", "studying"})
+
+_WORD_RE = re.compile(r"[a-z]+")
+
+
 def enhanced_fallback_response(prompt: str) -> str:
-    p = prompt.lower()
-    if any(w in p for w in ["resume", "cv", "career", "job", "apply"]):
+    # One pass over the prompt, then set intersections per branch
+    words = set(_WORD_RE.findall(prompt.lower()))
+    if CAREER_WORDS & words:
         return """I can help you with resume optimization and career guidance.
 
 Upload your resume text and I can:
@@ -143,25 +170,25 @@ Upload your resume text and I can:
 • Suggest improvements
 • Generate a professional LaTeX resume
 • Recommend tailored job roles."""
-    if "sql" in p or "database" in p:
+    if SQL_WORDS & words:
         return """**SQL Learning Path**
 1. SELECT, WHERE, ORDER BY
 2. INSERT, UPDATE, DELETE
 3. JOINS (INNER, LEFT, RIGHT)
 4. GROUP BY, HAVING
 5. Subqueries and indexes."""
-    if "python" in p:
+    if PYTHON_WORDS & words:
         return """**Python Learning Guide**
 • Basics: variables, loops, functions
 • Data structures: lists, dicts, sets
 • OOP principles
 • Libraries: Pandas, Flask, Requests"""
-    if "javascript" in p or "web" in p:
+    if WEB_WORDS & words:
         return """**JavaScript Web Dev**
 • DOM manipulation
 • Async (Promises, async/await)
 • React, Node.js basics"""
-    if "learn" in p or "study" in p:
+    if LEARN_WORDS & words:
         return """**Smart Learning Tips**
 1. Set goals
 2. Practice consistently
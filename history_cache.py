@@ -0,0 +1,33 @@
+# history_cache.py
+import threading
+
+import orjson
+from cachetools import TTLCache
+
+# --- Chat history page cache
+# History only changes through the owner's own save/delete/clear calls, so
+# pages are cached per user as encoded JSON and dropped on any write.
+HISTORY_CACHE = TTLCache(maxsize=5000, ttl=30)  # (kind, user_id) -> {(limit, before_id): bytes}
+_history_lock = threading.Lock()  # TTLCache is not thread-safe
+
+def history_cache_slot(kind: str, user_id: int):
+    """Return the user's page dict. Take it BEFORE reading the DB."""
+    with _history_lock:
+        return HISTORY_CACHE.setdefault((kind, user_id), {})
+
+def store_history_page(kind: str, user_id: int, slot: dict, page: tuple, body: bytes):
+    with _history_lock:
+        # A write that landed during our read has replaced the slot; don't
+        # cache what may already be stale
+        if HISTORY_CACHE.get((kind, user_id)) is slot:
+            slot[page] = body
+
+def invalidate_history(kind: str, user_id: int):
+    with _history_lock:
+        HISTORY_CACHE.pop((kind, user_id), None)
+
+def history_body(history: list, limit: int) -> bytes:
+    return orjson.dumps({
+        "history": history,
+        "next_before_id": history[-1]["id"] if len(history) == limit else None,
+    })
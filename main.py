@@ -1,52 +1,60 @@
 import os
 import asyncio
 import time
+import queue
+import atexit
 import logging
+from logging.handlers import QueueHandler, QueueListener
 import sqlite3
+import functools
+import itertools
 from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Optional
 
 from fastapi import (
-    FastAPI, HTTPException, Depends, Request
+    FastAPI, HTTPException, Depends, Request, BackgroundTasks
 )
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response, ORJSONResponse
 from pydantic import BaseModel, EmailStr
 from dotenv import load_dotenv
+import orjson
 
 # ==========================================================
 # LOGGING CONFIG
 # ==========================================================
+# Records go onto a queue and a listener thread writes them to stderr, so
+# request handlers never block on the stream write.
+_log_stream = logging.StreamHandler()
+_log_stream.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
+log_listener = QueueListener(queue.SimpleQueue(), _log_stream)
+
 logging.basicConfig(
     level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[logging.StreamHandler()]
+    format="%(message)s",  # QueueHandler only merges args; _log_stream formats
+    handlers=[QueueHandler(log_listener.queue)]
 )
+log_listener.start()
+atexit.register(log_listener.stop)  # flush what's still queued on exit
 
 # ==========================================================
 # ENV + PATHS
 # ==========================================================
 load_dotenv()
 
-# Base data root (single source of truth)
-if os.name == "nt":
-    DEFAULT_DATA_ROOT = r"C:\career_ai_data"
-else:
-    DEFAULT_DATA_ROOT = "/app/data"
-
-DATA_ROOT = os.path.abspath(os.getenv("DATA_ROOT", DEFAULT_DATA_ROOT))
-DB_PATH = os.path.join(DATA_ROOT, "career_ai.db")
+from compression import ApiGZipMiddleware
+from config import DATA_ROOT, DB_PATH, UPLOAD_DIR, GENERATED_DIR, MIKTEX_PATH
 
 # Ensure base data directory exists
 os.makedirs(DATA_ROOT, exist_ok=True)
 
-# MiKTeX only on Windows
-if os.name == "nt":
-    miktex_path = r"C:\Program Files\MiKTeX\miktex\bin\x64"
+if MIKTEX_PATH:
     path_env = os.environ.get("PATH", "")
-    if miktex_path not in path_env:
-        os.environ["PATH"] = miktex_path + os.pathsep + path_env
-    print("[INFO] MiKTeX path added to PATH:", miktex_path)
+    if MIKTEX_PATH not in path_env:
+        os.environ["PATH"] = MIKTEX_PATH + os.pathsep + path_env
+    print("[INFO] MiKTeX path added to PATH:", MIKTEX_PATH)
 else:
     print("[INFO] Running on Linux container — skipping MiKTeX PATH setup.")
 
@@ -54,13 +62,22 @@ else:
 # INTERNAL MODULES
 # ==========================================================
 try:
-    from models import ChatRequest, ChatResponse
+    from models import (
+        ChatRequest, ChatResponse,
+        ForgotRequest, ResetRequest, SaveChatRequest
+    )
     from auth import (
         create_token, verify_token,
-        hash_password, verify_password,
-        create_reset_token, verify_reset_token
+        hash_password, verify_password, needs_rehash,
+        create_reset_token, verify_reset_token,
+        cached_user_id, remember_user_id, user_id_for,
+        SQL_GET_USER_BY_EMAIL, SQL_GET_USER_CONTACT, SQL_INSERT_USER,
+        SQL_UPDATE_PASSWORD_BY_ID, SQL_UPDATE_PASSWORD_BY_EMAIL
+    )
+    from database import get_db, get_conn, transaction, connect, pool, POOL_SIZE
+    from history_cache import (
+        history_cache_slot, store_history_page, invalidate_history, history_body
     )
-    from database import get_db
     from email_utils import send_email
     logging.info("✅ Core modules imported successfully")
 except Exception as e:
@@ -98,10 +115,41 @@ def get_learning_agent():
     return _learning_agent
 
 
+# The async AI routes pass these to run_agent, so the agents are resolved on
+# an executor thread: the first call imports graph.py (langgraph, fitz, graph
+# build), which must not block the event loop and every request behind it.
+def call_career_agent(*args, **kwargs):
+    return get_career_agent()(*args, **kwargs)
+
+
+def call_learning_agent(*args, **kwargs):
+    return get_learning_agent()(*args, **kwargs)
+
+
 # ==========================================================
 # APP INIT
 # ==========================================================
-app = FastAPI(title="Career Navigator AI")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    print("🚀 Starting up Career Navigator AI...")
+    init_database()
+    pool.fill()
+    print(f"✅ Database initialization completed ({POOL_SIZE} pooled connections)")
+    chat_writer_task = asyncio.create_task(chat_writer())
+    yield
+    # Queued chat rows need the pool, so drain them before closing it
+    await flush_chat_writes()
+    chat_writer_task.cancel()
+    executor.shutdown(wait=False, cancel_futures=True)
+    db_executor.shutdown(wait=True)  # let in-flight queries return their connections
+    pool.close_all()
+
+
+app = FastAPI(
+    title="Career Navigator AI",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
 
 # CORS: allow GitHub Pages + localhost by default, override via env
 default_origins = ["*"]
@@ -111,25 +159,67 @@ if env_origins:
 else:
     allow_origins = default_origins
 
+# Auth is a bearer header, not cookies, so credentials stay off (which also keeps
+# "*" valid). Authorization/JSON bodies always preflight; max_age lets the
+# browser cache each preflight instead of repeating it before every call.
+CORS_METHODS = ["GET", "POST", "DELETE"]
+CORS_HEADERS = ["Authorization", "Content-Type"]
+CORS_MAX_AGE = 86400
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=allow_origins,
-    allow_credentials=False,          # allow Authorization header + cookies if needed
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_credentials=False,
+    allow_methods=CORS_METHODS,
+    allow_headers=CORS_HEADERS,
+    max_age=CORS_MAX_AGE,
 )
 
+# JSON lists and chat pages repeat the same keys on every row and compress
+# well; bodies under GZIP_MIN_BYTES aren't worth the CPU. PDF paths are skipped.
+GZIP_MIN_BYTES = 1024
+app.add_middleware(ApiGZipMiddleware, minimum_size=GZIP_MIN_BYTES, compresslevel=5)
+
 # ==========================================================
 # DIRECTORIES
 # ==========================================================
-UPLOAD_DIR = os.path.join(DATA_ROOT, "uploads")
-GENERATED_DIR = os.path.join(DATA_ROOT, "generated_resumes")
-
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 os.makedirs(GENERATED_DIR, exist_ok=True)
 
-app.mount("/uploads", StaticFiles(directory=UPLOAD_DIR), name="uploads")
-app.mount("/generated_resumes", StaticFiles(directory=GENERATED_DIR), name="generated_resumes")
+# Resolved once (symlinks included); /download-pdf containment checks compare
+# against this prefix. The trailing separator keeps "generated_evil" out.
+GENERATED_DIR_ABS = os.path.realpath(GENERATED_DIR) + os.sep
+
+
+class CachedStaticFiles(StaticFiles):
+    """StaticFiles that adds a Cache-Control header to 200/304 responses.
+    Starlette's FileResponse already emits ETag/Last-Modified and answers
+    If-None-Match with 304, so this only tells clients how long to trust it."""
+
+    def __init__(self, *args, cache_control: str, **kwargs):
+        self.cache_control = cache_control
+        super().__init__(*args, **kwargs)
+
+    async def get_response(self, path, scope):
+        response = await super().get_response(path, scope)
+        if response.status_code in (200, 304):
+            response.headers["Cache-Control"] = self.cache_control
+        return response
+
+
+# Both directories are write-once: generated resumes get a fresh uuid name per
+# render, and uploads a random token_hex part, so no file ever changes. Uploads
+# are applicants' resumes, so only the browser may cache them (private).
+app.mount(
+    "/uploads",
+    CachedStaticFiles(directory=UPLOAD_DIR, cache_control="private, max-age=31536000, immutable"),
+    name="uploads",
+)
+app.mount(
+    "/generated_resumes",
+    CachedStaticFiles(directory=GENERATED_DIR, cache_control="public, max-age=31536000, immutable"),
+    name="generated_resumes",
+)
 
 print(f"📂 Serving uploads from: {UPLOAD_DIR}")
 print(f"📄 Serving generated resumes from: {GENERATED_DIR}")
@@ -138,8 +228,29 @@ print(f"🗄️ Using database at: {DB_PATH}")
 # ==========================================================
 # EXECUTOR POOL
 # ==========================================================
-# Increase workers a bit for concurrent /api/learning usage
-executor = ThreadPoolExecutor(max_workers=10)
+# Agent calls (LLM + pdflatex) get their own pool rather than AnyIO's default
+# thread limiter: they hold threads for tens of seconds, and a timed-out call
+# keeps its thread busy, so sharing the limiter would starve the sync routes.
+executor = ThreadPoolExecutor(max_workers=10, thread_name_prefix="agent")
+
+# Short SQLite work from the async chat routes gets its own small pool, so it
+# never queues behind LLM calls (executor) or password hashing (FastAPI's pool).
+# One worker per pooled connection: more would only wait on pool checkout.
+DB_WORKERS = POOL_SIZE
+db_executor = ThreadPoolExecutor(max_workers=DB_WORKERS, thread_name_prefix="db")
+
+
+async def run_db(fn, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(db_executor, fn, *args)
+
+
+async def run_agent(fn, *args, timeout: float, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await asyncio.wait_for(
+        loop.run_in_executor(executor, functools.partial(fn, *args, **kwargs)),
+        timeout=timeout,
+    )
 
 # ==========================================================
 # MODELS
@@ -155,34 +266,33 @@ class LoginRequest(BaseModel):
     password: str
 
 
-class ForgotRequest(BaseModel):
-    email: EmailStr
-
-
-class ResetRequest(BaseModel):
-    token: str
-    new_password: str
+# ==========================================================
+# SQL
+# ==========================================================
+# sqlite3 caches prepared statements per connection keyed by the exact SQL
+# string, so hot queries live here as constants and are always passed verbatim.
+# (users queries are shared with spare_backend_file.py and live in auth.py)
+SQL_INSERT_LEARNING_CHAT = (
+    "INSERT INTO learning_chat_history (user_id, message, reply) VALUES (?, ?, ?)"
+)
+# Keyset pagination: newest first, resume below the last id of the previous page
+SQL_LEARNING_HISTORY = (
+    "SELECT id, message, reply, timestamp FROM learning_chat_history "
+    "WHERE user_id=? AND (? IS NULL OR id < ?) ORDER BY id DESC LIMIT ?"
+)
+HISTORY_PAGE_MAX = 200
+SQL_CLEAR_LEARNING_HISTORY = "DELETE FROM learning_chat_history WHERE user_id=?"
 
 
 # ==========================================================
 # DATABASE INITIALIZATION
 # ==========================================================
-def init_database():
-    """
-    Single source of truth DB init using DB_PATH.
-    Also enables WAL and foreign keys for better robustness.
-    """
-    os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
-    db_exists = os.path.exists(DB_PATH)
-
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False, timeout=30.0)
-    cur = conn.cursor()
-
-    # Basic tuning for concurrency + integrity
-    cur.execute("PRAGMA journal_mode=WAL;")
-    cur.execute("PRAGMA foreign_keys=ON;")
+# Bump whenever SCHEMA_SQL changes; it is idempotent, so the whole script is
+# simply re-run once on databases stamped with an older version.
+SCHEMA_VERSION = 2
 
-    cur.executescript("""
+SCHEMA_SQL = """
+BEGIN;
     CREATE TABLE IF NOT EXISTS users (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         email TEXT UNIQUE NOT NULL,
@@ -239,33 +349,91 @@ def init_database():
         timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
         FOREIGN KEY (user_id) REFERENCES users(id)
     );
-    """)
 
-    conn.commit()
-    conn.close()
-    print(f"✅ Database ready at {DB_PATH}" if db_exists else f"🆕 Created DB at {DB_PATH}")
+    -- History pages are keyset on id within a user; every index ends in the
+    -- rowid, so (user_id) alone serves WHERE user_id=? AND id<? ORDER BY id DESC
+    DROP INDEX IF EXISTS idx_career_chat_user_ts;
+    DROP INDEX IF EXISTS idx_learning_chat_user_ts;
+    CREATE INDEX IF NOT EXISTS idx_career_chat_user
+        ON career_chat_history(user_id);
+    CREATE INDEX IF NOT EXISTS idx_learning_chat_user
+        ON learning_chat_history(user_id);
+    CREATE INDEX IF NOT EXISTS idx_applications_user
+        ON applications(user_id, applied_at DESC);
+
+    -- Saved jobs are listed newest first; UNIQUE(user_id, job_id) can't serve the sort
+    CREATE INDEX IF NOT EXISTS idx_saved_jobs_user
+        ON saved_jobs(user_id, saved_at DESC);
+    -- Received applications: seek jobs by poster, then their applications by job
+    CREATE INDEX IF NOT EXISTS idx_jobs_posted_by
+        ON jobs(posted_by);
+    CREATE INDEX IF NOT EXISTS idx_applications_job
+        ON applications(job_id);
+    -- FK child side, so foreign-key checks on jobs don't scan saved_jobs
+    CREATE INDEX IF NOT EXISTS idx_saved_jobs_job
+        ON saved_jobs(job_id);
+"""
 
 
-@app.on_event("startup")
-async def startup_event():
-    print("🚀 Starting up Career Navigator AI...")
-    init_database()
-    print("✅ Database initialization completed")
+def init_database():
+    """
+    Single source of truth DB init using DB_PATH (from config).
+    Also enables WAL and foreign keys for better robustness.
+
+    The schema script only runs when PRAGMA user_version is behind
+    SCHEMA_VERSION, so restarts against an up-to-date DB skip all DDL.
+    """
+    db_exists = os.path.exists(DB_PATH)
+
+    conn = connect()
+    cur = conn.cursor()
+
+    # WAL is persistent in the DB file; per-connection PRAGMAs come from connect()
+    cur.execute("PRAGMA journal_mode=WAL;")
+    cur.execute("PRAGMA wal_autocheckpoint=1000;")
+
+    version = cur.execute("PRAGMA user_version;").fetchone()[0]
+    if version < SCHEMA_VERSION:
+        # One transaction: a single fsync, and no half-applied schema
+        cur.executescript(
+            SCHEMA_SQL + f"PRAGMA user_version = {SCHEMA_VERSION};\nCOMMIT;\n"
+        )
+        logging.info(f"[DB] Schema migrated from version {version} to {SCHEMA_VERSION}")
+
+    # Fresh planner statistics for the join-heavy routes; analysis_limit
+    # (set in connect()) keeps this cheap on a large DB
+    cur.execute("ANALYZE;")
+
+    conn.close()
+    print(f"✅ Database ready at {DB_PATH}" if db_exists else f"🆕 Created DB at {DB_PATH}")
 
 
 # ==========================================================
 # MIDDLEWARE
 # ==========================================================
+# Static files and probes are hit constantly; don't pay for a log line on each
+UNLOGGED_PREFIXES = ("/uploads/", "/generated_resumes/", "/health")
+# Fast successful requests are logged at DEBUG, i.e. dropped at the default level
+SLOW_REQUEST_SECS = 0.2
+
+
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
-    start = time.time()
+    path = request.url.path
+    if path == "/" or path.startswith(UNLOGGED_PREFIXES):
+        return await call_next(request)
+
+    start = time.perf_counter()
     try:
         response = await call_next(request)
     except Exception as e:
-        logging.error(f"[UNHANDLED ERROR] {request.method} {request.url.path}: {e}", exc_info=True)
+        logging.error("[UNHANDLED ERROR] %s %s: %s", request.method, path, e, exc_info=True)
         raise
-    duration = time.time() - start
-    logging.info(f"{request.method} {request.url.path} → {response.status_code} ({duration:.2f}s)")
+    duration = time.perf_counter() - start
+    status = response.status_code
+    level = logging.DEBUG if status < 400 and duration < SLOW_REQUEST_SECS else logging.INFO
+    # %-style so formatting is deferred until the record is actually emitted
+    logging.log(level, "%s %s → %s (%.2fs)", request.method, path, status, duration)
     return response
 
 
@@ -364,7 +532,11 @@ async def test_download():
 @app.get("/download-pdf/{filename}")
 async def download_pdf(filename: str):
     safe_name = os.path.basename(filename)
-    file_path = os.path.join(GENERATED_DIR, safe_name)
+    file_path = os.path.join(GENERATED_DIR_ABS, safe_name)
+
+    # realpath, so a symlink inside the directory can't point outside it
+    if not os.path.realpath(file_path).startswith(GENERATED_DIR_ABS):
+        raise HTTPException(status_code=400, detail="Invalid filename")
 
     if not os.path.isfile(file_path):
         raise HTTPException(status_code=404, detail="File not found")
@@ -377,6 +549,21 @@ async def download_pdf(filename: str):
     )
 
 
+# ==========================================================
+# CURRENT USER
+# ==========================================================
+async def current_user_id(user=Depends(verify_token)) -> int:
+    """Dependency: resolve the JWT subject to users.id via auth's cache. With
+    verify_token async too, a hit never leaves the event loop; only a miss
+    goes to SQLite (on db_executor)."""
+    user_id = cached_user_id(user)
+    if user_id is None:
+        user_id = await run_db(user_id_for, user)
+    if user_id is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user_id
+
+
 # ==========================================================
 # AUTH ROUTES
 # ==========================================================
@@ -402,32 +589,19 @@ def signup(user: SignupRequest):
         raise HTTPException(status_code=500, detail="Internal server error")
 
     try:
-        conn = get_db()
-    except Exception as e:
-        # get_db already logs, but be explicit here too
-        logging.error(f"[SIGNUP] get_db() failed for {email}: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail="Internal server error")
-
-    try:
-        cur = conn.cursor()
-        cur.execute(
-            "INSERT INTO users (email, username, password) VALUES (?, ?, ?)",
-            (email, username, hashed),
-        )
-        conn.commit()
+        with transaction() as conn:
+            cur = conn.cursor()
+            cur.execute(SQL_INSERT_USER, (email, username, hashed))
+        remember_user_id(username, cur.lastrowid)
         logging.info(f"[SIGNUP] Success for email={email}, username={username}")
         return {"msg": "Signup successful"}
     except sqlite3.IntegrityError as e:
-        conn.rollback()
         logging.warning(f"[SIGNUP] Integrity error for {email}, {username}: {e}")
         # Could be email or username; don't leak which one
         raise HTTPException(status_code=409, detail="Email or username already exists")
     except Exception as e:
-        conn.rollback()
         logging.error(f"[SIGNUP] Unexpected DB error for {email}: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Internal server error")
-    finally:
-        conn.close()
 
 
 
@@ -439,16 +613,22 @@ def login(user: LoginRequest):
     if not password:
         raise HTTPException(status_code=400, detail="Password is required")
 
-    conn = get_db()
-    conn.row_factory = sqlite3.Row
     try:
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM users WHERE email=?", (email,))
-        row = cur.fetchone()
-        if not row or not verify_password(password, row["password"]):
+        # Hashing happens outside the borrowed connection so it isn't held for ~100ms
+        with get_conn() as conn:
+            row = conn.execute(SQL_GET_USER_BY_EMAIL, (email,)).fetchone()
+        # Unknown emails still pay for an argon2 verify (against a dummy hash)
+        if not verify_password(password, row["password"] if row else None):
             # Don't leak which part is wrong
             raise HTTPException(status_code=401, detail="Invalid credentials")
 
+        # Transparently upgrade legacy sha256 / outdated argon2 parameters
+        if needs_rehash(row["password"]):
+            rehashed = hash_password(password)
+            with transaction() as conn:
+                conn.execute(SQL_UPDATE_PASSWORD_BY_ID, (rehashed, row["id"]))
+
+        remember_user_id(row["username"], row["id"])
         token = create_token(row["username"])
         return {"token": token, "username": row["username"]}
     except HTTPException:
@@ -456,19 +636,14 @@ def login(user: LoginRequest):
     except Exception as e:
         logging.error(f"[LOGIN] error: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Internal server error")
-    finally:
-        conn.close()
 
 
 @app.post("/api/forgot")
-def forgot(req: ForgotRequest):
+def forgot(req: ForgotRequest, bg: BackgroundTasks):
     email = req.email.strip().lower()
-    conn = get_db()
-    conn.row_factory = sqlite3.Row
     try:
-        cur = conn.cursor()
-        cur.execute("SELECT username, email FROM users WHERE email=?", (email,))
-        result = cur.fetchone()
+        with get_conn() as conn:
+            result = conn.execute(SQL_GET_USER_CONTACT, (email,)).fetchone()
 
         # Always respond 200; only send email if user exists
         if result:
@@ -479,14 +654,13 @@ def forgot(req: ForgotRequest):
                 f"Here is your password reset token:\n{token}\n\n"
                 f"– Career Navigator AI"
             )
-            send_email(user_email, "Career Navigator AI – Password Reset", body)
+            # Sent after the response goes out; send_email logs its own failures
+            bg.add_task(send_email, user_email, "Career Navigator AI – Password Reset", body)
 
         return {"msg": "If the email exists, a reset link has been sent."}
     except Exception as e:
         logging.error(f"[FORGOT] error: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Internal server error")
-    finally:
-        conn.close()
 
 
 @app.post("/api/reset")
@@ -499,45 +673,40 @@ def reset(data: ResetRequest):
     if len(new_password) < 6:
         raise HTTPException(status_code=400, detail="Password must be at least 6 characters")
 
-    conn = get_db()
     try:
-        cur = conn.cursor()
-        cur.execute(
-            "UPDATE users SET password=? WHERE email=?",
-            (hash_password(new_password), email.strip().lower()),
-        )
-        if cur.rowcount == 0:
-            raise HTTPException(status_code=404, detail="User not found")
-        conn.commit()
+        hashed = hash_password(new_password)
+        with transaction() as conn:
+            cur = conn.execute(SQL_UPDATE_PASSWORD_BY_EMAIL, (hashed, email.strip().lower()))
+            if cur.rowcount == 0:
+                raise HTTPException(status_code=404, detail="User not found")
         return {"msg": "Password updated successfully"}
     except HTTPException:
-        conn.rollback()
         raise
     except Exception as e:
         logging.error(f"[RESET] error: {e}", exc_info=True)
-        conn.rollback()
         raise HTTPException(status_code=500, detail="Internal server error")
-    finally:
-        conn.close()
 
 
 # ==========================================================
 # AI ROUTES
 # ==========================================================
 @app.post("/api/career", response_model=ChatResponse)
-def career(req: ChatRequest, user=Depends(verify_token)):
+async def career(req: ChatRequest, user=Depends(verify_token)):
     try:
-        career_agent = get_career_agent()
-        data = req.dict()
-        resume_text = data.get("resume_text", "").strip()
+        resume_text = (req.resume_text or "").strip()
         if not resume_text:
             raise HTTPException(status_code=400, detail="No resume text provided")
-        result = career_agent({
-            "message": data.get("message"),
+        payload = {
+            "message": req.message,
             "resume_text": resume_text,
-            "job_posts": data.get("job_posts", [])
-        })
+            "job_posts": req.job_posts or []
+        }
+        # Up to three LLM calls plus two pdflatex passes
+        result = await run_agent(call_career_agent, payload, timeout=120.0)
         return ChatResponse(**result)
+    except asyncio.TimeoutError:
+        logging.error("[CAREER] Timeout")
+        raise HTTPException(status_code=504, detail="AI service timeout")
     except HTTPException:
         raise
     except Exception as e:
@@ -549,15 +718,9 @@ def career(req: ChatRequest, user=Depends(verify_token)):
 async def learning(req: ChatRequest, user=Depends(verify_token)):
     try:
         logging.info(f"[LEARNING] Request from {user}")
-        learning_agent = get_learning_agent()
-        loop = asyncio.get_running_loop()
-        payload = req.dict()
-        result = await asyncio.wait_for(
-            loop.run_in_executor(
-                executor,
-                lambda: learning_agent(payload, thread_id=payload.get("thread_id")),
-            ),
-            timeout=60.0,  # more realistic timeout for heavy calls
+        payload = {"message": req.message, "thread_id": req.thread_id}
+        result = await run_agent(
+            call_learning_agent, payload, thread_id=req.thread_id, timeout=60.0
         )
         return ChatResponse(**result)
     except asyncio.TimeoutError:
@@ -570,97 +733,169 @@ async def learning(req: ChatRequest, user=Depends(verify_token)):
         raise HTTPException(status_code=500, detail="Learning agent error")
 
 
+# ==========================================================
+# CHAT WRITE QUEUE
+# ==========================================================
+# Chat saves and clears are queued and written by one background task in
+# batches, so a single commit (and WAL fsync) covers many writes instead of one
+# per request. Everything goes through the queue in order: a clear can't be
+# overtaken by a save acknowledged before it.
+CHAT_BATCH_ROWS = 100
+CHAT_BATCH_WINDOW = 0.05  # seconds to wait for more rows after the first
+CHAT_QUEUE_MAX = 10_000
+CHAT_FLUSH_TIMEOUT = 10.0
+
+# Items are (sql, params, history_key); history_key is the (kind, user_id)
+# cache entry to drop once the row is committed, or None
+chat_write_queue: asyncio.Queue = asyncio.Queue(maxsize=CHAT_QUEUE_MAX)
+
+
+def _write_chat_rows(items):
+    # Consecutive items with the same statement share one executemany; runs stay
+    # in queue order, so save/clear/save is applied as save/clear/save
+    with transaction() as conn:
+        for sql, run in itertools.groupby(items, key=lambda item: item[0]):
+            conn.executemany(sql, [params for _, params, _ in run])
+
+
+def _write_chat_batch(items):
+    """Commit items in one transaction; if that fails, retry one by one so only bad rows are lost."""
+    try:
+        _write_chat_rows(items)
+        return
+    except Exception as e:
+        if len(items) == 1:
+            raise
+        logging.warning(f"[CHAT WRITER] Batch of {len(items)} failed ({e}); retrying row by row")
+
+    for item in items:
+        try:
+            _write_chat_rows([item])
+        except Exception as e:
+            logging.error(f"[CHAT WRITER] Dropped chat write for {item[2]}: {e}", exc_info=True)
+
+
+async def _commit_chat_batch(items):
+    await run_db(_write_chat_batch, items)
+    for history_key in {key for _, _, key in items if key}:
+        invalidate_history(*history_key)
+
+
+async def _next_chat_batch():
+    loop = asyncio.get_running_loop()
+    batch = [await chat_write_queue.get()]
+    deadline = loop.time() + CHAT_BATCH_WINDOW
+    while len(batch) < CHAT_BATCH_ROWS:
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            break
+        try:
+            batch.append(await asyncio.wait_for(chat_write_queue.get(), remaining))
+        except asyncio.TimeoutError:
+            break
+    return batch
+
+
+async def chat_writer():
+    while True:
+        batch = await _next_chat_batch()
+        try:
+            await _commit_chat_batch(batch)
+        except Exception as e:
+            logging.error(f"[CHAT WRITER] Failed to write {len(batch)} chat rows: {e}", exc_info=True)
+        finally:
+            for _ in batch:
+                chat_write_queue.task_done()
+
+
+async def enqueue_chat_write(sql: str, params: tuple, history_key: Optional[tuple] = None):
+    # When the writer is behind, wait for room: that is the caller's backpressure.
+    # Writing inline instead would jump ahead of queued writes and break ordering.
+    await chat_write_queue.put((sql, params, history_key))
+
+
+async def flush_chat_writes():
+    try:
+        await asyncio.wait_for(chat_write_queue.join(), CHAT_FLUSH_TIMEOUT)
+    except asyncio.TimeoutError:
+        logging.error(f"[CHAT WRITER] {chat_write_queue.qsize()} chat rows not flushed at shutdown")
+
+
 # ==========================================================
 # CHAT HISTORY ROUTES
 # ==========================================================
-@app.post("/api/learning/chat/save")
-def save_learning_chat(chat: dict, user=Depends(verify_token)):
-    message, reply = chat.get("message", "").strip(), chat.get("reply", "").strip()
-    if not message or not reply:
-        raise HTTPException(status_code=400, detail="Message and reply required")
+# Blocking bodies run on db_executor; the async routes only validate and await.
+# Pooled connections roll back any open transaction when they are returned.
+def _get_learning_chat_history(user_id: int, limit: int, before_id: Optional[int]):
+    with get_conn() as conn:
+        cur = conn.execute(SQL_LEARNING_HISTORY, (user_id, before_id, before_id, limit))
+        # Positional access: skips sqlite3.Row name lookups and dict(r) copies
+        return [{"id": r[0], "message": r[1], "reply": r[2], "timestamp": r[3]} for r in cur]
 
-    conn = get_db()
-    conn.row_factory = sqlite3.Row
+
+@app.post("/api/learning/chat/save", status_code=202)
+async def save_learning_chat(chat: SaveChatRequest, user_id: int = Depends(current_user_id)):
     try:
-        cur = conn.cursor()
-        cur.execute("SELECT id FROM users WHERE username=?", (user,))
-        row = cur.fetchone()
-        if not row:
-            raise HTTPException(status_code=404, detail="User not found")
-
-        cur.execute(
-            "INSERT INTO learning_chat_history (user_id, message, reply) VALUES (?, ?, ?)",
-            (row["id"], message, reply),
+        await enqueue_chat_write(
+            SQL_INSERT_LEARNING_CHAT,
+            (user_id, chat.message, chat.reply),
+            history_key=("learning", user_id),
         )
-        conn.commit()
         return {"msg": "Learning chat saved successfully"}
-    except HTTPException:
-        conn.rollback()
-        raise
     except Exception as e:
         logging.error(f"[SAVE CHAT] error: {e}", exc_info=True)
-        conn.rollback()
         raise HTTPException(status_code=500, detail="Internal server error")
-    finally:
-        conn.close()
 
 
 @app.get("/api/learning/chat/history")
-def get_learning_chat_history(user=Depends(verify_token)):
-    conn = get_db()
-    conn.row_factory = sqlite3.Row
+async def get_learning_chat_history(
+    limit: int = 50,
+    before_id: Optional[int] = None,
+    user_id: int = Depends(current_user_id),
+):
+    limit = max(1, min(limit, HISTORY_PAGE_MAX))
+    page = (limit, before_id)
     try:
-        cur = conn.cursor()
-        cur.execute("SELECT id FROM users WHERE username=?", (user,))
-        row = cur.fetchone()
-        if not row:
-            raise HTTPException(status_code=404, detail="User not found")
-
-        cur.execute(
-            "SELECT id, message, reply, timestamp "
-            "FROM learning_chat_history WHERE user_id=? ORDER BY timestamp DESC",
-            (row["id"],),
-        )
-        data = cur.fetchall()
-        return {"history": [dict(r) for r in data]}
+        slot = history_cache_slot("learning", user_id)
+        body = slot.get(page)
+        if body is None:
+            history = await run_db(_get_learning_chat_history, user_id, limit, before_id)
+            body = history_body(history, limit)
+            store_history_page("learning", user_id, slot, page, body)
+        return Response(content=body, media_type="application/json")
     except Exception as e:
         logging.error(f"[GET CHAT HISTORY] error: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail="Internal server error")
-    finally:
-        conn.close()
 
 
-@app.delete("/api/learning/chat/clear")
-def clear_learning_chat_history(user=Depends(verify_token)):
-    conn = get_db()
-    conn.row_factory = sqlite3.Row
+# Queued behind any pending saves (see CHAT WRITE QUEUE), hence 202 like save
+@app.delete("/api/learning/chat/clear", status_code=202)
+async def clear_learning_chat_history(user_id: int = Depends(current_user_id)):
     try:
-        cur = conn.cursor()
-        cur.execute("SELECT id FROM users WHERE username=?", (user,))
-        row = cur.fetchone()
-        if not row:
-            raise HTTPException(status_code=404, detail="User not found")
-        cur.execute("DELETE FROM learning_chat_history WHERE user_id=?", (row["id"],))
-        conn.commit()
+        await enqueue_chat_write(
+            SQL_CLEAR_LEARNING_HISTORY, (user_id,), history_key=("learning", user_id)
+        )
         return {"msg": "All learning chat history cleared"}
-    except HTTPException:
-        conn.rollback()
-        raise
     except Exception as e:
         logging.error(f"[CLEAR CHAT] error: {e}", exc_info=True)
-        conn.rollback()
         raise HTTPException(status_code=500, detail="Internal server error")
-    finally:
-        conn.close()
 
 
 # ==========================================================
 # HEALTH & ROOT
 # ==========================================================
+# Probe bodies are constant; encode once. A fresh Response is still built per
+# call because middleware (CORS) mutates response headers in place. async def
+# keeps these off the threadpool entirely.
+HEALTH_BODY = orjson.dumps({"status": "healthy", "message": "API is running"})
+ROOT_BODY = orjson.dumps({"status": "ok", "message": "Career Navigator AI Backend Active"})
+PROBE_HEADERS = {"Cache-Control": "public, max-age=5"}
+
+
 @app.get("/health")
-def health_check():
+async def health_check():
     """Basic health check - returns quickly if app is running"""
-    return {"status": "healthy", "message": "API is running"}
+    return Response(content=HEALTH_BODY, media_type="application/json", headers=PROBE_HEADERS)
 
 
 @app.get("/health/detailed")
@@ -709,5 +944,5 @@ def detailed_health_check():
 
 
 @app.get("/")
-def root():
-    return {"status": "ok", "message": "Career Navigator AI Backend Active"}
+async def root():
+    return Response(content=ROOT_BODY, media_type="application/json", headers=PROBE_HEADERS)
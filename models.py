@@ -1,7 +1,9 @@
 # models.py
-from pydantic import BaseModel
-from typing import List, Optional
-from typing import List, Dict, Any, Optional
+from pydantic import BaseModel, EmailStr, Field, StringConstraints
+from typing import Annotated, List, Dict, Any, Optional
+
+# Stripped, non-empty text field (validated by pydantic-core in one pass)
+NonEmptyStr = Annotated[str, StringConstraints(strip_whitespace=True, min_length=1)]
 
 class ChatRequest(BaseModel):
     message: str
@@ -27,4 +29,28 @@ class TTSRequest(BaseModel):
     text: str
 
 class TTSResponse(BaseModel):
-    audio_b64: str
\ No newline at end of file
+    audio_b64: str
+
+class ForgotRequest(BaseModel):
+    email: EmailStr
+
+class ResetRequest(BaseModel):
+    token: str
+    new_password: str
+
+class SaveChatRequest(BaseModel):
+    message: NonEmptyStr
+    reply: NonEmptyStr
+
+class AddJobRequest(BaseModel):
+    title: NonEmptyStr
+    company: NonEmptyStr
+    location: str = ""
+    description: str = ""
+    link: str = ""
+
+class AddJobsBulkRequest(BaseModel):
+    jobs: List[AddJobRequest] = Field(min_length=1, max_length=500)
+
+class SaveJobRequest(BaseModel):
+    job_id: int
@@ -1,27 +1,38 @@
-import os, shutil
-from fastapi import FastAPI, HTTPException, Depends, Form, UploadFile, File
+import os, sys, shutil, hashlib
+from contextlib import asynccontextmanager
+from secrets import token_hex
+from typing import Optional
+from fastapi import FastAPI, HTTPException, Depends, Form, UploadFile, File, Request, Response, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import ORJSONResponse
+from fastapi.concurrency import run_in_threadpool
 from dotenv import load_dotenv
-from models import ChatRequest, ChatResponse
+from models import (
+    ChatRequest, ChatResponse,
+    ForgotRequest, ResetRequest, SaveChatRequest, AddJobRequest, AddJobsBulkRequest, SaveJobRequest
+)
 from graph import career_agent, learning_agent
 from auth import (
-    create_token, verify_token,
+    create_token, verify_token, user_id_for, remember_user_id,
     hash_password, verify_password,
-    create_reset_token, verify_reset_token
+    create_reset_token, verify_reset_token,
+    SQL_GET_USER_BY_EMAIL, SQL_GET_USER_CONTACT, SQL_INSERT_USER, SQL_UPDATE_PASSWORD_BY_EMAIL
 )
-from database import get_db
+from database import get_conn, transaction, pool
+from history_cache import history_cache_slot, store_history_page, invalidate_history, history_body
+from compression import ApiGZipMiddleware
+from config import UPLOAD_DIR, GENERATED_DIR, MIKTEX_PATH
 from pydantic import BaseModel, EmailStr
+import orjson
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 
 # ✅ Manually add MiKTeX path to system PATH for FastAPI subprocess calls
-miktex_path = r"C:\Program Files\MiKTeX\miktex\bin\x64"
-if miktex_path not in os.environ["PATH"]:
-    os.environ["PATH"] = miktex_path + os.pathsep + os.environ["PATH"]
-
-print("[INFO] MiKTeX path added to PATH:", miktex_path)
+if MIKTEX_PATH and MIKTEX_PATH not in os.environ["PATH"]:
+    os.environ["PATH"] = MIKTEX_PATH + os.pathsep + os.environ["PATH"]
+    print("[INFO] MiKTeX path added to PATH:", MIKTEX_PATH)
 
 
 # def db_execute(query, params=(), fetchone=False, commit=False):
@@ -50,32 +61,168 @@ class LoginRequest(BaseModel):
 # ==========================================================
 load_dotenv()
 
-app = FastAPI(title="Career Navigator AI")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    pool.fill()
+    yield
+    pool.close_all()
+
+
+app = FastAPI(title="Career Navigator AI", lifespan=lifespan, default_response_class=ORJSONResponse)
+
+# Upload routes: a declared Content-Length over the cap is refused here,
+# before Starlette reads the body. Chunked bodies carry no length, so
+# check_pdf() re-checks the spooled size before anything is written.
+MAX_UPLOAD_BYTES = 10 * 1024 * 1024
+UPLOAD_PATHS = ("/api/jobs/apply", "/api/resume/upload")
+
+
+# Registered before CORSMiddleware so CORS still wraps the 413
+@app.middleware("http")
+async def limit_upload_size(request: Request, call_next):
+    if request.method == "POST" and request.url.path in UPLOAD_PATHS:
+        length = request.headers.get("content-length")
+        if length and length.isdigit() and int(length) > MAX_UPLOAD_BYTES:
+            return ORJSONResponse({"detail": "File too large"}, status_code=413)
+    return await call_next(request)
+
+# "*" with credentials is invalid CORS; auth is a bearer header, so drop credentials
+env_origins = os.getenv("FRONTEND_ORIGINS")
+allow_origins = [o.strip() for o in env_origins.split(",") if o.strip()] if env_origins else ["*"]
 
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_origins=allow_origins,
+    allow_credentials=False,
+    allow_methods=["GET", "POST", "DELETE"],
+    allow_headers=["Authorization", "Content-Type"],
     expose_headers=["Content-Disposition"],  # ✅ allows browser to download PDFs
+    max_age=86400,  # browsers cache the preflight instead of repeating it
 )
+# Compress JSON bodies of 1 KB and up; list rows repeat the same keys.
+# PDF paths (/uploads, /generated_resumes) are skipped.
+app.add_middleware(ApiGZipMiddleware, minimum_size=1024, compresslevel=5)
 
 # ==========================================================
 # STATIC FILES (Outside OneDrive for speed)
 # ==========================================================
-DATA_ROOT = "C:\\career_ai_data"
-UPLOAD_DIR = os.path.join(DATA_ROOT, "uploads")
-GENERATED_DIR = os.path.join(DATA_ROOT, "generated_resumes")
-
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 os.makedirs(GENERATED_DIR, exist_ok=True)
 
+# Resolved once (symlinks included); upload_path() compares against this
+# prefix. The trailing separator keeps "uploads_evil" out.
+UPLOAD_DIR_ABS = os.path.realpath(UPLOAD_DIR) + os.sep
+
 app.mount("/uploads", StaticFiles(directory=UPLOAD_DIR), name="uploads")
 app.mount("/generated_resumes", StaticFiles(directory=GENERATED_DIR), name="generated_resumes")
 
 print("✅ Using LLM:", os.getenv("OLLAMA_MODEL", "llama3"))
 
+# ==========================================================
+# SQL
+# ==========================================================
+# Module constants, passed verbatim (see main.py's SQL section); the users
+# queries come from auth.py.
+SQL_INSERT_JOB = """
+    INSERT INTO jobs (title, company, location, description, link, posted_by)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+SQL_JOBS_FINGERPRINT = "SELECT MAX(id), COUNT(*) FROM jobs"
+# Keyset pagination on the rowid: newest first, O(limit) per page.
+# description is left to GET /api/jobs/{job_id}; it dominates row size.
+SQL_JOBS_PAGE = """
+    SELECT id, title, company, location, link, posted_by, posted_at
+    FROM jobs
+    WHERE (? IS NULL OR id < ?)
+    ORDER BY id DESC
+    LIMIT ?
+"""
+SQL_SAVE_JOB = "INSERT INTO saved_jobs (user_id, job_id) VALUES (?, ?)"
+# The *_JSON queries return one row: the whole list as a JSON array built by
+# SQLite. Rows are ordered in a subquery so the array keeps that order.
+SQL_SAVED_JOBS_JSON = """
+    SELECT json_group_array(json_object(
+        'id', id, 'title', title, 'company', company, 'location', location,
+        'link', link, 'posted_by', posted_by, 'posted_at', posted_at, 'saved_at', saved_at
+    ))
+    FROM (
+        SELECT jobs.id, jobs.title, jobs.company, jobs.location, jobs.link,
+               jobs.posted_by, jobs.posted_at, saved_jobs.saved_at
+        FROM jobs
+        JOIN saved_jobs ON jobs.id = saved_jobs.job_id
+        WHERE saved_jobs.user_id=?
+        ORDER BY saved_jobs.saved_at DESC
+    )
+"""
+SQL_INSERT_APPLICATION = (
+    "INSERT INTO applications (user_id, job_id, resume_path) VALUES (?, ?, ?)"
+)
+SQL_APPLICATIONS_JSON = """
+    SELECT json_group_array(json_object(
+        'title', title, 'company', company, 'location', location,
+        'resume_path', resume_path, 'applied_at', applied_at
+    ))
+    FROM (
+        SELECT jobs.title, jobs.company, jobs.location,
+               applications.resume_path, applications.applied_at
+        FROM applications
+        JOIN jobs ON jobs.id = applications.job_id
+        WHERE applications.user_id=?
+        ORDER BY applications.applied_at DESC
+    )
+"""
+SQL_RECEIVED_APPLICATIONS_JSON = """
+    SELECT json_group_array(json_object(
+        'job_title', job_title, 'company', company, 'location', location,
+        'applicant_name', applicant_name, 'applicant_email', applicant_email,
+        'resume_path', resume_path, 'applied_at', applied_at
+    ))
+    FROM (
+        SELECT jobs.title AS job_title, jobs.company, jobs.location,
+               users.username AS applicant_name, users.email AS applicant_email,
+               applications.resume_path, applications.applied_at
+        FROM applications
+        JOIN jobs ON applications.job_id = jobs.id
+        JOIN users ON applications.user_id = users.id
+        WHERE jobs.posted_by=?
+        ORDER BY applications.applied_at DESC
+    )
+"""
+SQL_GET_JOB = """
+    SELECT id, title, company, location, description, link, posted_by, posted_at
+    FROM jobs WHERE id=?
+"""
+
+
+# ==========================================================
+# CURRENT USER
+# ==========================================================
+def current_user_id(user=Depends(verify_token)) -> int:
+    """Dependency: JWT subject -> users.id, served from auth's cache after the first hit."""
+    user_id = user_id_for(user)
+    if user_id is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user_id
+
+
+# ==========================================================
+# LIST RESPONSES
+# ==========================================================
+# List routes return ORJSONResponse directly: FastAPI skips its
+# jsonable_encoder walk over every row for Response return values.
+def row_dicts(cur) -> list:
+    """Cursor rows as dicts, with column names read once per query."""
+    cols = [d[0] for d in cur.description]
+    return [dict(zip(cols, r)) for r in cur]
+
+
+def json_list_response(key: str, sql: str, params) -> Response:
+    """Wrap the JSON array from a *_JSON query as {key: [...]}, with no per-row Python work."""
+    with get_conn() as conn:
+        payload = conn.execute(sql, params).fetchone()[0]
+    return Response(content=f'{{"{key}":{payload}}}', media_type="application/json")
+
+
 # ==========================================================
 # AUTH ROUTES
 # ==========================================================
@@ -86,20 +233,14 @@ def signup(user: SignupRequest):
     if not all([email, username, password]):
         raise HTTPException(status_code=400, detail="Missing fields")
 
-    conn = get_db()
-    cur = conn.cursor()
     try:
-        cur.execute(
-            "INSERT INTO users (email, username, password) VALUES (?, ?, ?)",
-            (email, username, hash_password(password))
-        )
-        conn.commit()
+        hashed = hash_password(password)
+        with transaction() as conn:
+            cur = conn.execute(SQL_INSERT_USER, (email, username, hashed))
+        remember_user_id(username, cur.lastrowid)
         return {"msg": "Signup successful"}
     except Exception as e:
-        conn.rollback()
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        conn.close()
 
 
 @app.post("/api/login")
@@ -109,31 +250,26 @@ def login(user: LoginRequest):
     if not all([email, password]):
         raise HTTPException(status_code=400, detail="Missing email or password")
 
-    conn = get_db()
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM users WHERE email=?", (email,))
-    row = cur.fetchone()
+    with get_conn() as conn:
+        row = conn.execute(SQL_GET_USER_BY_EMAIL, (email,)).fetchone()
 
-    if not row or not verify_password(password, row["password"]):
-        conn.close()
+    # Unknown emails still pay for an argon2 verify, so timing doesn't reveal them
+    if not verify_password(password, row["password"] if row else None):
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
+    remember_user_id(row["username"], row["id"])
     token = create_token(row["username"])
-    conn.close()
     return {"token": token, "username": row["username"]}
 
 
 from email_utils import send_email
 
 @app.post("/api/forgot")
-def forgot(user: dict):
-    user_email = user.get("email")
-    conn = get_db()
-    cur = conn.cursor()
-
+def forgot(req: ForgotRequest, bg: BackgroundTasks):
+    user_email = req.email
     # Fetch the full user record
-    cur.execute("SELECT username, email FROM users WHERE email=?", (user_email,))
-    result = cur.fetchone()
+    with get_conn() as conn:
+        result = conn.execute(SQL_GET_USER_CONTACT, (user_email,)).fetchone()
 
     if not result:
         raise HTTPException(status_code=404, detail="Email not found")
@@ -155,25 +291,21 @@ If you didn’t request a password reset, you can safely ignore this email.
 
 – Career Navigator AI
 """
-    try:
-        send_email(user_email, "Career Navigator AI – Password Reset", body)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Email sending failed: {str(e)}")
+    # Sent after the response goes out; send_email logs its own failures
+    bg.add_task(send_email, user_email, "Career Navigator AI – Password Reset", body)
 
     return {"msg": f"Password reset link has been sent to {user_email}"}
 
 
 @app.post("/api/reset")
-def reset(data: dict):
-    token, new_pass = data.get("token"), data.get("new_password")
+def reset(data: ResetRequest):
+    token, new_pass = data.token, data.new_password
     email = verify_reset_token(token)
     if not email:
         raise HTTPException(status_code=400, detail="Invalid or expired token")
-    conn = get_db()
-    cur = conn.cursor()
-    cur.execute("UPDATE users SET password=? WHERE email=?", (hash_password(new_pass), email))
-    conn.commit()
-    conn.close()
+    hashed = hash_password(new_pass)
+    with transaction() as conn:
+        conn.execute(SQL_UPDATE_PASSWORD_BY_EMAIL, (hashed, email))
     return {"msg": "Password updated successfully"}
 
 # ==========================================================
@@ -181,17 +313,16 @@ def reset(data: dict):
 # ==========================================================
 @app.post("/api/career", response_model=ChatResponse)
 def career(req: ChatRequest, user=Depends(verify_token)):
-    data = req.dict()
-    resume_text = data.get("resume_text", "").strip()
+    resume_text = (req.resume_text or "").strip()
 
     if not resume_text:
         raise HTTPException(status_code=400, detail="No resume text provided")
 
     # Run the smart agent
     result = career_agent({
-        "message": data.get("message"),
+        "message": req.message,
         "resume_text": resume_text,
-        "job_posts": data.get("job_posts", [])
+        "job_posts": req.job_posts or []
     })
 
     # Return all available fields (reply, PDF path, LaTeX code, intent)
@@ -205,209 +336,217 @@ def career(req: ChatRequest, user=Depends(verify_token)):
 
 @app.post("/api/learning", response_model=ChatResponse)
 def learning(req: ChatRequest, user=Depends(verify_token)):
-    result = learning_agent(req.dict(), thread_id=req.thread_id)
+    result = learning_agent({"message": req.message, "thread_id": req.thread_id}, thread_id=req.thread_id)
     return ChatResponse(reply=result.get("reply", ""))
 
+# ==========================================================
+# UPLOAD COPY
+# ==========================================================
+COPY_BUFSIZE = 1 << 20  # 1 MB; shutil's default is 64 KB
+# Linux sendfile accepts a regular file as the destination; macOS needs a socket
+CAN_SENDFILE = sys.platform.startswith("linux")
+# Resumes are written once and rarely read back; past this size, push them
+# out of the page cache so they don't evict hot DB pages
+DROP_CACHE_BYTES = 8 * 1024 * 1024
+CAN_FADVISE = hasattr(os, "posix_fadvise")
+
+
+def check_pdf(upload: UploadFile):
+    """
+    Reject an upload unless it is a PDF within MAX_UPLOAD_BYTES: declared
+    content type, spooled size, then magic bytes. Nothing touches UPLOAD_DIR.
+    """
+    if upload.content_type != "application/pdf":
+        raise HTTPException(status_code=400, detail="Invalid file type")
+
+    # Seek to the end rather than fileno(): works whether or not the spool rolled to disk
+    upload.file.seek(0, os.SEEK_END)
+    if upload.file.tell() > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail="File too large")
+
+    upload.file.seek(0)
+    header = upload.file.read(5)
+    upload.file.seek(0)
+    if header != b"%PDF-":
+        raise HTTPException(status_code=400, detail="Only PDF files allowed")
+
+
+def upload_path(filename: str) -> str:
+    """Absolute path for `filename` in UPLOAD_DIR; 400 if it would land anywhere else."""
+    path = os.path.realpath(os.path.join(UPLOAD_DIR_ABS, filename))
+    if not path.startswith(UPLOAD_DIR_ABS):
+        raise HTTPException(status_code=400, detail="Invalid file name")
+    return path
+
+
+def save_upload(upload: UploadFile, path: str):
+    """
+    Copy an upload's spooled temp file to `path` (blocking; call from a thread).
+
+    Uploads past Starlette's in-memory spool limit are already on disk; those
+    are copied in-kernel with os.sendfile. Small in-memory ones use a 1 MB
+    copyfileobj. Large files are then flushed and dropped from the page cache.
+    """
+    src = upload.file
+    src.seek(0)
+    with open(path, "wb") as dst:
+        # SpooledTemporaryFile._rolled: has it moved to a real file? (fileno()
+        # would force a rollover, so check first)
+        if CAN_SENDFILE and getattr(src, "_rolled", False):
+            size = os.fstat(src.fileno()).st_size
+            offset = 0
+            while offset < size:
+                sent = os.sendfile(dst.fileno(), src.fileno(), offset, size - offset)
+                if sent == 0:
+                    break
+                offset += sent
+        else:
+            shutil.copyfileobj(src, dst, COPY_BUFSIZE)
+
+        dst.flush()
+        # fstat, not tell(): sendfile moves the fd offset behind Python's back
+        if CAN_FADVISE and os.fstat(dst.fileno()).st_size > DROP_CACHE_BYTES:
+            # DONTNEED only drops clean pages, so write them back first
+            os.fdatasync(dst.fileno())
+            os.posix_fadvise(dst.fileno(), 0, 0, os.POSIX_FADV_DONTNEED)
+
+
 # ==========================================================
 # JOB ROUTES
 # ==========================================================
 @app.post("/api/jobs/add")
-def add_job(job: dict, user=Depends(verify_token)):
-    title, company = job.get("title"), job.get("company")
-    location = job.get("location", "")
-    description = job.get("description", "")
-    link = job.get("link", "")
-    posted_by = user
-
-    if not title or not company:
-        raise HTTPException(status_code=400, detail="Title and company are required")
-
-    conn = get_db()
-    cur = conn.cursor()
+def add_job(job: AddJobRequest, user=Depends(verify_token)):
     try:
-        cur.execute(
-            """
-            INSERT INTO jobs (title, company, location, description, link, posted_by)
-            VALUES (?, ?, ?, ?, ?, ?)
-            """,
-            (title, company, location, description, link, posted_by)
-        )
-        conn.commit()
+        with transaction() as conn:
+            conn.execute(
+                SQL_INSERT_JOB,
+                (job.title, job.company, job.location, job.description, job.link, user)
+            )
         return {"msg": "Job added successfully"}
     except Exception as e:
-        conn.rollback()
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        conn.close()
+
+
+@app.post("/api/jobs/add_bulk")
+def add_jobs_bulk(data: AddJobsBulkRequest, user=Depends(verify_token)):
+    rows = [(j.title, j.company, j.location, j.description, j.link, user) for j in data.jobs]
+    try:
+        # One transaction, so one commit for the whole batch
+        with transaction() as conn:
+            conn.executemany(SQL_INSERT_JOB, rows)
+        return {"msg": f"{len(rows)} jobs added successfully"}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/api/jobs")
-def get_jobs():
-    conn = get_db()
-    cur = conn.cursor()
-    cur.execute("SELECT * FROM jobs ORDER BY posted_at DESC")
-    rows = cur.fetchall()
-    conn.close()
-    return {"jobs": [dict(r) for r in rows]}
+def get_jobs(request: Request, after_id: Optional[int] = None, limit: int = 50):
+    limit = max(1, min(limit, 200))
+
+    with get_conn() as conn:
+        cur = conn.cursor()
+
+        # Table fingerprint (+ page params) -> ETag, so revalidation skips the page query
+        cur.execute(SQL_JOBS_FINGERPRINT)
+        max_id, count = cur.fetchone()
+        # Weak: the same page may go out gzipped or plain
+        etag = 'W/"%s"' % hashlib.blake2b(
+            f"{max_id}:{count}:{after_id}:{limit}".encode(), digest_size=16
+        ).hexdigest()
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "private, max-age=5"})
+
+        cur.execute(SQL_JOBS_PAGE, (after_id, after_id, limit))
+        jobs = row_dicts(cur)
+
+    return ORJSONResponse(
+        {"jobs": jobs, "next_after_id": jobs[-1]["id"] if len(jobs) == limit else None},
+        # Short max-age absorbs quick back/forward navigation; after that the ETag revalidates
+        headers={"ETag": etag, "Cache-Control": "private, max-age=5"},
+    )
 
 
 @app.post("/api/jobs/save")
-def save_job(data: dict, user=Depends(verify_token)):
-    job_id = data.get("job_id")
-    if not job_id:
-        raise HTTPException(status_code=400, detail="Missing job_id")
-
-    conn = get_db()
-    cur = conn.cursor()
-    cur.execute("SELECT id FROM users WHERE username=?", (user,))
-    user_row = cur.fetchone()
-    if not user_row:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    user_id = user_row["id"]
+def save_job(data: SaveJobRequest, user_id: int = Depends(current_user_id)):
     try:
-        cur.execute("INSERT INTO saved_jobs (user_id, job_id) VALUES (?, ?)", (user_id, job_id))
-        conn.commit()
+        with transaction() as conn:
+            conn.execute(SQL_SAVE_JOB, (user_id, data.job_id))
         msg = "Job saved successfully"
     except Exception as e:
-        conn.rollback()
         msg = f"Job save failed: {str(e)}"
-    finally:
-        conn.close()
 
     return {"msg": msg}
 
 
 @app.get("/api/jobs/saved")
-def get_saved_jobs(user=Depends(verify_token)):
-    conn = get_db()
-    cur = conn.cursor()
-    cur.execute("SELECT id FROM users WHERE username=?", (user,))
-    user_row = cur.fetchone()
-    if not user_row:
-        raise HTTPException(status_code=404, detail="User not found")
-    user_id = user_row["id"]
-
-    cur.execute(
-        """
-        SELECT jobs.* FROM jobs
-        JOIN saved_jobs ON jobs.id = saved_jobs.job_id
-        WHERE saved_jobs.user_id=?
-        ORDER BY saved_jobs.saved_at DESC
-        """,
-        (user_id,)
-    )
-    saved = cur.fetchall()
-    conn.close()
-    return {"saved_jobs": [dict(r) for r in saved]}
+def get_saved_jobs(user_id: int = Depends(current_user_id)):
+    return json_list_response("saved_jobs", SQL_SAVED_JOBS_JSON, (user_id,))
 
 
+# Plain def: the file copy and the insert both block, so FastAPI runs the whole
+# handler in its threadpool instead of on the event loop.
 @app.post("/api/jobs/apply")
-async def apply_to_job(
+def apply_to_job(
     job_id: int = Form(...),
     resume: UploadFile = File(...),
-    user=Depends(verify_token)
+    user_id: int = Depends(current_user_id)
 ):
-    conn = get_db()
-    cur = conn.cursor()
-    cur.execute("SELECT id FROM users WHERE username=?", (user,))
-    row = cur.fetchone()
-    if not row:
-        raise HTTPException(status_code=404, detail="User not found")
+    check_pdf(resume)
 
-    user_id = row["id"]
-    filename = f"{user}_{job_id}_{resume.filename}"
-    save_path = os.path.join(UPLOAD_DIR, filename)
+    # Usernames and client filenames are both untrusted: name the file by
+    # users.id, keep only the basename of the client's name, add a random prefix
+    filename = f"{user_id}_{job_id}_{token_hex(8)}_{os.path.basename(resume.filename or 'resume.pdf')}"
+    save_path = upload_path(filename)
 
-    if resume.content_type != "application/pdf":
-        raise HTTPException(status_code=400, detail="Invalid file type")
-
-    # Stream save for speed and low memory
-    with open(save_path, "wb") as f:
-        shutil.copyfileobj(resume.file, f)
+    save_upload(resume, save_path)
 
     try:
-        cur.execute(
-            "INSERT INTO applications (user_id, job_id, resume_path) VALUES (?, ?, ?)",
-            (user_id, job_id, f"/uploads/{filename}")
-        )
-        conn.commit()
-        return {"msg": "Application submitted successfully!", "resume": f"/uploads/{filename}"}
+        with transaction() as conn:
+            conn.execute(SQL_INSERT_APPLICATION, (user_id, job_id, f"/uploads/{filename}"))
     except Exception as e:
-        conn.rollback()
+        os.remove(save_path)
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        conn.close()
 
+    return {"msg": "Application submitted successfully!", "resume": f"/uploads/{filename}"}
 
-@app.get("/api/jobs/applications")
-def get_applications(user=Depends(verify_token)):
-    conn = get_db()
-    cur = conn.cursor()
-    cur.execute("SELECT id FROM users WHERE username=?", (user,))
-    row = cur.fetchone()
-    if not row:
-        raise HTTPException(status_code=404, detail="User not found")
-    user_id = row["id"]
 
-    cur.execute(
-        """
-        SELECT jobs.title, jobs.company, jobs.location,
-               applications.resume_path, applications.applied_at
-        FROM applications
-        JOIN jobs ON jobs.id = applications.job_id
-        WHERE applications.user_id=?
-        ORDER BY applications.applied_at DESC
-        """,
-        (user_id,)
-    )
-    apps = cur.fetchall()
-    conn.close()
-    return {"applications": [dict(r) for r in apps]}
+@app.get("/api/jobs/applications")
+def get_applications(user_id: int = Depends(current_user_id)):
+    return json_list_response("applications", SQL_APPLICATIONS_JSON, (user_id,))
 
 
 @app.get("/api/jobs/received")
 def get_received_applications(user=Depends(verify_token)):
-    conn = get_db()
-    cur = conn.cursor()
-    cur.execute(
-        """
-        SELECT jobs.title AS job_title, jobs.company, jobs.location,
-               users.username AS applicant_name, users.email AS applicant_email,
-               applications.resume_path, applications.applied_at
-        FROM applications
-        JOIN jobs ON applications.job_id = jobs.id
-        JOIN users ON applications.user_id = users.id
-        WHERE jobs.posted_by=?
-        ORDER BY applications.applied_at DESC
-        """,
-        (user,)
-    )
-    rows = cur.fetchall()
-    conn.close()
-    return {"received_applications": [dict(r) for r in rows]}
+    return json_list_response("received_applications", SQL_RECEIVED_APPLICATIONS_JSON, (user,))
+
+
+# Declared after the fixed /api/jobs/* GET routes, which it would otherwise shadow
+@app.get("/api/jobs/{job_id}")
+def get_job(job_id: int):
+    with get_conn() as conn:
+        row = conn.execute(SQL_GET_JOB, (job_id,)).fetchone()
+    if not row:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return dict(row)
 
 # ==========================================================
 # RESUME UPLOAD
 # ==========================================================
 @app.post("/api/resume/upload")
-async def upload_resume(resume: UploadFile = File(...), user=Depends(verify_token)):
+async def upload_resume(resume: UploadFile = File(...), user_id: int = Depends(current_user_id)):
     # --------- FAST, ROBUST UPLOAD (only change you asked for) ---------
     if not resume.filename.lower().endswith(".pdf"):
         raise HTTPException(status_code=400, detail="Only PDF files allowed")
+    # A seek and 5 bytes from the spooled body; no need for a thread hop
+    check_pdf(resume)
 
-    import uuid
-    filename = f"{user}_resume_{uuid.uuid4().hex}.pdf"
-    save_path = os.path.join(UPLOAD_DIR, filename)
+    # Named by users.id: usernames are free-form and may contain "../"
+    filename = f"{user_id}_resume_{token_hex(16)}.pdf"
+    save_path = upload_path(filename)
 
     try:
-        # Stream to disk in chunks (prevents long waits and memory spikes)
-        with open(save_path, "wb") as f:
-            while True:
-                chunk = await resume.read(1024 * 1024)  # 1MB
-                if not chunk:
-                    break
-                f.write(chunk)
+        # The body is already spooled by Starlette; copy it off the event loop
+        await run_in_threadpool(save_upload, resume, save_path)
         return {"msg": "Resume uploaded successfully!", "path": f"/uploads/{filename}"}
     except Exception as e:
         # Ensure partial files don't linger on disk
@@ -422,157 +561,81 @@ async def upload_resume(resume: UploadFile = File(...), user=Depends(verify_toke
 # ==========================================================
 # CHAT ROUTES (Career + Learning)
 # ==========================================================
-@app.post("/api/career/chat/save")
-def save_career_chat(chat: dict, user=Depends(verify_token)):
-    message, reply = chat.get("message"), chat.get("reply")
-    if not message or not reply:
-        raise HTTPException(status_code=400, detail="Missing chat data")
-
-    conn = get_db()
-    cur = conn.cursor()
-    cur.execute("SELECT id FROM users WHERE username=?", (user,))
-    user_row = cur.fetchone()
-    if not user_row:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    try:
-        cur.execute(
-            "INSERT INTO career_chat_history (user_id, message, reply) VALUES (?, ?, ?)",
-            (user_row["id"], message, reply)
-        )
-        conn.commit()
-        return {"msg": "Career chat saved successfully"}
-    except Exception as e:
-        conn.rollback()
-        raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        conn.close()
-
-
-@app.get("/api/career/chat/history")
-def get_career_chat_history(user=Depends(verify_token)):
-    conn = get_db()
-    cur = conn.cursor()
-    cur.execute("SELECT id FROM users WHERE username=?", (user,))
-    row = cur.fetchone()
-    if not row:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    cur.execute(
-        "SELECT id, message, reply, timestamp FROM career_chat_history WHERE user_id=? ORDER BY timestamp DESC",
-        (row["id"],)
+# Career and learning chats share one implementation; only the table differs.
+# Each handler is a single statement; users.id comes from current_user_id,
+# so the users table is only touched on a cache miss.
+def make_chat_routes(app: FastAPI, prefix: str, table: str):
+    """Register /api/{prefix}/chat/{save,history,delete/{chat_id},clear} backed by `table`."""
+    # Built once per table, so each is still one verbatim string for the statement cache
+    sql_insert = f"INSERT INTO {table} (user_id, message, reply) VALUES (?, ?, ?)"
+    # Keyset pagination: newest first, resume below the last id of the previous page
+    sql_history = (
+        f"SELECT id, message, reply, timestamp FROM {table} "
+        "WHERE user_id=? AND (? IS NULL OR id < ?) "
+        "ORDER BY id DESC LIMIT ?"
     )
-    chats = cur.fetchall()
-    conn.close()
-    return {"history": [dict(r) for r in chats]}
-
-
-@app.delete("/api/career/chat/delete/{chat_id}")
-def delete_career_chat(chat_id: int, user=Depends(verify_token)):
-    conn = get_db()
-    cur = conn.cursor()
-    cur.execute("SELECT id FROM users WHERE username=?", (user,))
-    row = cur.fetchone()
-    if not row:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    cur.execute("DELETE FROM career_chat_history WHERE id=? AND user_id=?", (chat_id, row["id"]))
-    conn.commit()
-    conn.close()
-    return {"msg": "Career chat deleted"}
+    sql_delete = f"DELETE FROM {table} WHERE id=? AND user_id=?"
+    sql_clear = f"DELETE FROM {table} WHERE user_id=?"
+    label = prefix.capitalize()
 
+    @app.post(f"/api/{prefix}/chat/save", name=f"save_{prefix}_chat")
+    def save_chat(chat: SaveChatRequest, user_id: int = Depends(current_user_id)):
+        try:
+            with transaction() as conn:
+                conn.execute(sql_insert, (user_id, chat.message, chat.reply))
+            invalidate_history(prefix, user_id)
+            return {"msg": f"{label} chat saved successfully"}
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+    @app.get(f"/api/{prefix}/chat/history", name=f"get_{prefix}_chat_history")
+    def get_chat_history(user_id: int = Depends(current_user_id), limit: int = 50, before_id: Optional[int] = None):
+        limit = max(1, min(limit, 200))
+        page = (limit, before_id)
+        slot = history_cache_slot(prefix, user_id)
+        body = slot.get(page)
+        if body is not None:
+            return Response(content=body, media_type="application/json")
+
+        with get_conn() as conn:
+            cur = conn.execute(sql_history, (user_id, before_id, before_id, limit))
+            chats = [{"id": r[0], "message": r[1], "reply": r[2], "timestamp": r[3]} for r in cur]
+        body = history_body(chats, limit)
+        store_history_page(prefix, user_id, slot, page, body)
+        return Response(content=body, media_type="application/json")
+
+    @app.delete(f"/api/{prefix}/chat/delete/{{chat_id}}", name=f"delete_{prefix}_chat")
+    def delete_chat(chat_id: int, user_id: int = Depends(current_user_id)):
+        with transaction() as conn:
+            cur = conn.execute(sql_delete, (chat_id, user_id))
+        if cur.rowcount == 0:
+            raise HTTPException(status_code=404, detail="Chat not found")
+        invalidate_history(prefix, user_id)
+        return {"msg": f"{label} chat deleted"}
+
+    @app.delete(f"/api/{prefix}/chat/clear", name=f"clear_{prefix}_chat_history")
+    def clear_chat_history(user_id: int = Depends(current_user_id)):
+        with transaction() as conn:
+            conn.execute(sql_clear, (user_id,))
+        invalidate_history(prefix, user_id)
+        return {"msg": f"All {prefix} chat history cleared"}
+
+
+make_chat_routes(app, "career", "career_chat_history")
+make_chat_routes(app, "learning", "learning_chat_history")
+
+HEALTH_BODY = orjson.dumps({"status": "healthy"})
+ROOT_BODY = orjson.dumps({"status": "ok", "message": "Career Navigator AI Backend Active"})
+PROBE_HEADERS = {"Cache-Control": "public, max-age=5"}
 
-@app.delete("/api/career/chat/clear")
-def clear_career_chat_history(user=Depends(verify_token)):
-    conn = get_db()
-    cur = conn.cursor()
-    cur.execute("SELECT id FROM users WHERE username=?", (user,))
-    row = cur.fetchone()
-    if not row:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    cur.execute("DELETE FROM career_chat_history WHERE user_id=?", (row["id"],))
-    conn.commit()
-    conn.close()
-    return {"msg": "All career chat history cleared"}
-
-
-@app.post("/api/learning/chat/save")
-def save_learning_chat(chat: dict, user=Depends(verify_token)):
-    message, reply = chat.get("message"), chat.get("reply")
-    if not message or not reply:
-        raise HTTPException(status_code=400, detail="Missing chat data")
-
-    conn = get_db()
-    cur = conn.cursor()
-    cur.execute("SELECT id FROM users WHERE username=?", (user,))
-    row = cur.fetchone()
-    if not row:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    cur.execute(
-        "INSERT INTO learning_chat_history (user_id, message, reply) VALUES (?, ?, ?)",
-        (row["id"], message, reply)
-    )
-    conn.commit()
-    conn.close()
-    return {"msg": "Learning chat saved successfully"}
-
-
-@app.get("/api/learning/chat/history")
-def get_learning_chat_history(user=Depends(verify_token)):
-    conn = get_db()
-    cur = conn.cursor()
-    cur.execute("SELECT id FROM users WHERE username=?", (user,))
-    row = cur.fetchone()
-    if not row:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    cur.execute(
-        "SELECT id, message, reply, timestamp FROM learning_chat_history WHERE user_id=? ORDER BY timestamp DESC",
-        (row["id"],)
-    )
-    chats = cur.fetchall()
-    conn.close()
-    return {"history": [dict(r) for r in chats]}
-
-
-@app.delete("/api/learning/chat/delete/{chat_id}")
-def delete_learning_chat(chat_id: int, user=Depends(verify_token)):
-    conn = get_db()
-    cur = conn.cursor()
-    cur.execute("SELECT id FROM users WHERE username=?", (user,))
-    row = cur.fetchone()
-    if not row:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    cur.execute("DELETE FROM learning_chat_history WHERE id=? AND user_id=?", (chat_id, row["id"]))
-    conn.commit()
-    conn.close()
-    return {"msg": "Learning chat deleted"}
-
-
-@app.delete("/api/learning/chat/clear")
-def clear_learning_chat_history(user=Depends(verify_token)):
-    conn = get_db()
-    cur = conn.cursor()
-    cur.execute("SELECT id FROM users WHERE username=?", (user,))
-    row = cur.fetchone()
-    if not row:
-        raise HTTPException(status_code=404, detail="User not found")
-
-    cur.execute("DELETE FROM learning_chat_history WHERE user_id=?", (row["id"],))
-    conn.commit()
-    conn.close()
-    return {"msg": "All learning chat history cleared"}
 
 @app.get("/health")
-def health_check():
-    return {"status": "healthy"}
+async def health_check():
+    return Response(content=HEALTH_BODY, media_type="application/json", headers=PROBE_HEADERS)
 
 # ==========================================================
 # ROOT
 # ==========================================================
 @app.get("/")
-def root():
-    return {"status": "ok", "message": "Career Navigator AI Backend Active"}
+async def root():
+    return Response(content=ROOT_BODY, media_type="application/json", headers=PROBE_HEADERS)
@@ -5,55 +5,79 @@ Checks all imports and dependencies to catch issues early
 """
 import sys
 import logging
+import subprocess
+import importlib.util
 
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s - %(levelname)s - %(message)s"
 )
 
+def _has(module):
+    """True if `module` is installed; finds it without running its init code."""
+    try:
+        return importlib.util.find_spec(module) is not None
+    except (ImportError, ValueError):
+        return False
+
 def check_imports():
-    """Verify all critical imports work"""
+    """Verify all critical dependencies are installed"""
     checks = [
-        ("FastAPI", lambda: __import__("fastapi")),
-        ("SQLite3", lambda: __import__("sqlite3")),
-        ("Pydantic", lambda: __import__("pydantic")),
-        ("python-jose", lambda: __import__("jose")),
-        ("LangGraph", lambda: __import__("langgraph")),
-        ("PyMuPDF (fitz)", lambda: __import__("fitz")),
-        ("Requests", lambda: __import__("requests")),
-        ("Spacy", lambda: __import__("spacy")),
+        ("FastAPI", "fastapi"),
+        ("SQLite3", "sqlite3"),
+        ("Pydantic", "pydantic"),
+        ("python-jose", "jose"),
+        ("LangGraph", "langgraph"),
+        ("PyMuPDF (fitz)", "fitz"),
+        ("Requests", "requests"),
+        ("Spacy", "spacy"),
     ]
     
     failed = []
-    for name, importer in checks:
-        try:
-            importer()
+    for name, module in checks:
+        if _has(module):
             logging.info(f"✅ {name}")
-        except ImportError as e:
-            logging.error(f"❌ {name}: {e}")
+        else:
+            logging.error(f"❌ {name}: not installed")
             failed.append(name)
     
     return len(failed) == 0
 
+# Run by check_app_imports in a child interpreter: one "name<TAB>error" line
+# per module (empty error on success)
+_IMPORT_PROBE = r"""
+import importlib, sys
+for name in sys.argv[1:]:
+    try:
+        importlib.import_module(name)
+        print(name + "\t")
+    except Exception as e:
+        print(name + "\t" + (" ".join(str(e).split()) or type(e).__name__))
+"""
+
 def check_app_imports():
-    """Verify app modules import correctly"""
-    modules = [
-        ("models", lambda: __import__("models")),
-        ("auth", lambda: __import__("auth")),
-        ("database", lambda: __import__("database")),
-        ("email_utils", lambda: __import__("email_utils")),
-        ("tools", lambda: __import__("tools")),
-        ("graph", lambda: __import__("graph")),
-    ]
+    """Verify app modules import correctly (in a subprocess, so heavy deps don't linger here)"""
+    modules = ["models", "auth", "database", "email_utils", "tools", "graph"]
+    
+    try:
+        proc = subprocess.run(
+            [sys.executable, "-c", _IMPORT_PROBE, *modules],
+            capture_output=True, text=True, timeout=300,
+        )
+    except Exception as e:
+        logging.error(f"❌ App module check could not run: {e}")
+        return False
+    
+    results = dict(line.split("\t", 1) for line in proc.stdout.splitlines() if "\t" in line)
     
     failed = []
-    for name, importer in modules:
-        try:
-            importer()
-            logging.info(f"✅ Module: {name}")
-        except Exception as e:
-            logging.error(f"❌ Module {name}: {e}")
+    for name in modules:
+        error = results.get(name, f"no result (exit code {proc.returncode})")
+        if error:
+            logging.error(f"❌ Module {name}: {error}")
             failed.append(name)
+        else:
+            logging.info(f"✅ Module: {name}")
     
     return len(failed) == 0
 
@@ -74,7 +98,7 @@ def check_main_app():
     """Verify main app initializes"""
     try:
         # This will import and initialize the app
-        from main import app, startup_event
+        from main import app
         logging.info("✅ Main app initialization")
         return True
     except Exception as e:
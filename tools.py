@@ -1,42 +1,75 @@
 # tools.py
-from typing import List, Dict
+from typing import List, Dict, Tuple
 import re
+import hashlib
+import threading
+from functools import lru_cache
+from operator import itemgetter
+
+from cachetools import LRUCache
 
 # ---- Career tools (simple, effective stubs you can improve fast) ----
 
-def analyze_resume(text: str) -> Dict:
-    """Very simple heuristic resume analyzer.
-    Returns detected skills and suggestions.
-    """
-    skills_db = [
-        "python", "java", "c++", "sql", "mongodb", "mysql", "react", "node",
-        "express", "aws", "docker", "kubernetes", "git", "rest", "linux",
-        "pandas", "numpy", "tensorflow", "pytorch"
-    ]
+skills_db = (
+    "python", "java", "c++", "sql", "mongodb", "mysql", "react", "node",
+    "express", "aws", "docker", "kubernetes", "git", "rest", "linux",
+    "pandas", "numpy", "tensorflow", "pytorch"
+)
+
+# One pass over the text for all skills. Lookarounds instead of \b, which
+# can't delimit "c++"; longest names first so none is cut short by a prefix.
+SKILLS_RE = re.compile(
+    r"(?<![\w+])("
+    + "|".join(re.escape(s) for s in sorted(skills_db, key=len, reverse=True))
+    + r")(?![\w+])"
+)
+
+
+# Re-uploads of the same resume skip the scan. Keyed by a 16-byte digest so
+# the cache never holds full resume texts; values are immutable tuples.
+ANALYSIS_CACHE = LRUCache(maxsize=1024)
+_analysis_lock = threading.Lock()  # LRUCache is not thread-safe
+
+
+def _analyze(text: str) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
     text_l = text.lower()
-    found = sorted({s for s in skills_db if re.search(rf"\\b{s}\\b", text_l)})
+    found_set = {m.group(1) for m in SKILLS_RE.finditer(text_l)}
 
     suggestions = []
-    if "sql" not in found:
+    if "sql" not in found_set:
         suggestions.append("Add SQL with a concrete bullet (e.g., optimized 5 complex joins)")
-    if "aws" not in found:
+    if "aws" not in found_set:
         suggestions.append("Mention basic cloud skills (AWS/GCP/Azure) if relevant")
-    if "react" not in found and "node" not in found:
+    if "react" not in found_set and "node" not in found_set:
         suggestions.append("If applying for full-stack, include React/Node exposure")
 
-    return {"skills": found, "suggestions": suggestions}
+    return tuple(sorted(found_set)), tuple(suggestions)
+
+
+def analyze_resume(text: str) -> Dict:
+    """Very simple heuristic resume analyzer.
+    Returns detected skills and suggestions.
+    """
+    key = hashlib.blake2b(text.encode("utf-8", "ignore"), digest_size=16).digest()
+    with _analysis_lock:
+        result = ANALYSIS_CACHE.get(key)
+    if result is None:
+        result = _analyze(text)
+        with _analysis_lock:
+            ANALYSIS_CACHE[key] = result
+
+    skills, suggestions = result
+    # Fresh lists: callers may mutate what they get back
+    return {"skills": list(skills), "suggestions": list(suggestions)}
 
 
 def match_jobs(skills: List[str], job_posts: List[Dict]) -> List[Dict]:
     """Return job posts sorted by naive skill overlap score."""
-    def score(post):
-        reqs = [s.lower() for s in post.get("requirements", [])]
-        return len(set(skills) & set(reqs))
-
-    ranked = sorted(job_posts, key=score, reverse=True)
-    for p in ranked:
-        p["match_score"] = len(set(skills) & set([s.lower() for s in p.get("requirements", [])]))
-    return ranked
+    skill_set = frozenset(s.lower() for s in skills)
+    # Score each post once; the sort reuses the stored score
+    for p in job_posts:
+        p["match_score"] = len(skill_set.intersection(s.lower() for s in p.get("requirements", ())))
+    return sorted(job_posts, key=itemgetter("match_score"), reverse=True)
 
 
 # ---- Learning tools ----
@@ -52,19 +85,25 @@ def generate_learning_path(topic: str) -> List[str]:
     ]
 
 
-def quick_quiz(topic: str) -> List[Dict]:
+@lru_cache(maxsize=1024)
+def _quiz(topic: str) -> Tuple[Tuple[str, str], ...]:
     t = topic.strip().lower()
     if "sql" in t:
-        return [
-            {"q": "What does SELECT do?", "a": "Retrieves rows/columns from a table."},
-            {"q": "Write a query to get all names from employees.", "a": "SELECT name FROM employees;"},
-        ]
+        return (
+            ("What does SELECT do?", "Retrieves rows/columns from a table."),
+            ("Write a query to get all names from employees.", "SELECT name FROM employees;"),
+        )
     if "python" in t:
-        return [
-            {"q": "What is a list comprehension?", "a": "A compact syntax to create lists: [f(x) for x in xs]"},
-            {"q": "How do you create a virtual environment?", "a": "python -m venv .venv && source .venv/bin/activate"},
-        ]
-    return [
-        {"q": f"Name 2 fundamentals of {topic}", "a": "Answers vary"},
-        {"q": f"Suggest a tiny project in {topic}", "a": "Answers vary"},
-    ]
\ No newline at end of file
+        return (
+            ("What is a list comprehension?", "A compact syntax to create lists: [f(x) for x in xs]"),
+            ("How do you create a virtual environment?", "python -m venv .venv && source .venv/bin/activate"),
+        )
+    return (
+        (f"Name 2 fundamentals of {topic}", "Answers vary"),
+        (f"Suggest a tiny project in {topic}", "Answers vary"),
+    )
+
+
+def quick_quiz(topic: str) -> List[Dict]:
+    # Cached per topic string; the generic questions echo it verbatim
+    return [{"q": q, "a": a} for q, a in _quiz(topic)]
\ No newline at end of file